@@ -7,10 +7,10 @@ from textwrap import dedent
 
 # Import your model exactly as you do today
 try:
-    from model.simulate import Params, simulate
+    from model.simulate import Params, SimWorkspace, simulate
 except Exception:
     # Fallback for running in a flat folder alongside simulate.py
-    from simulate import Params, simulate
+    from simulate import Params, SimWorkspace, simulate
 
 st.set_page_config(page_title="School SD Simulator — Modo Clase", layout="wide")
 st.title("Modelo de Dinámica de Sistemas — Colegio · 🧑‍🏫 Modo Clase")
@@ -122,6 +122,9 @@ def load_params_from_json(txt: str):
 if "params" not in st.session_state:
     st.session_state.params = ensure_params_defaults(Params())
 
+if "sim_ws" not in st.session_state:
+    st.session_state.sim_ws = SimWorkspace(st.session_state.params.years)
+
 if "snapA" not in st.session_state:
     st.session_state.snapA = None
 if "snapB" not in st.session_state:
@@ -204,7 +207,7 @@ with tab_inicio:
 
 with tab_sim:
     # Ejecutar simulación
-    df, meta = simulate(st.session_state.params)
+    df, meta = simulate(st.session_state.params, workspace=st.session_state.sim_ws)
     df = canonicalize_columns(df)
     kpis(df)
     st.subheader("Alumnos, Calidad y Resultado Neto")
@@ -279,7 +282,7 @@ with tab_actividades:
 
 with tab_export:
     st.subheader("Descargar resultados y preset")
-    df, meta = simulate(st.session_state.params)
+    df, meta = simulate(st.session_state.params, workspace=st.session_state.sim_ws)
     df = canonicalize_columns(df)
     st.download_button("Descargar resultados (.csv)", data=df.to_csv(index=False).encode("utf-8"),
                        file_name="resultados_simulacion.csv", mime="text/csv", use_container_width=True)
@@ -0,0 +1,58 @@
+"""Latencia de `simulate`: sin workspace, con `SimWorkspace` reutilizable y,
+opcionalmente, contra la versión del modelo en otra revisión de git.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_simulate.py [--runs 200] [--years 20] [--ref <rev>]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from model.simulate import Params, SimWorkspace, simulate  # noqa: E402
+
+
+def load_simulate_at(ref: str):
+    """Carga `model/simulate.py` tal como estaba en la revisión `ref`."""
+    src = subprocess.check_output(["git", "show", f"{ref}:model/simulate.py"], cwd=ROOT, text=True)
+    mod = types.ModuleType(f"simulate_{ref}")
+    exec(compile(src, f"{ref}:model/simulate.py", "exec"), mod.__dict__)
+    return mod
+
+
+def per_run(fn, runs: int) -> float:
+    fn()  # calentamiento
+    return min(timeit.repeat(fn, number=runs, repeat=3)) / runs
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=200)
+    ap.add_argument("--years", type=int, default=20)
+    ap.add_argument("--ref", default=None, help="revisión de git contra la cual comparar (p.ej. HEAD~1)")
+    args = ap.parse_args()
+
+    par = Params(years=args.years)
+    ws = SimWorkspace(par.years)
+
+    rows = []
+    if args.ref:
+        old = load_simulate_at(args.ref)
+        old_par = old.Params(years=args.years)
+        rows.append((f"ref {args.ref}", per_run(lambda: old.simulate(old_par), args.runs)))
+    rows.append(("sin workspace", per_run(lambda: simulate(par), args.runs)))
+    rows.append(("con workspace", per_run(lambda: simulate(par, workspace=ws), args.runs)))
+
+    base = rows[0][1]
+    print(f"years={par.years} runs={args.runs}")
+    for name, t in rows:
+        print(f"  {name:<16}: {t * 1e3:8.3f} ms/run  ({base / t:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Calibración de `Params` contra series históricas (alumnos, facturación, caja).
+
+Flujo típico:
+
+    obs = load_observed("data/samples/observed_example.csv")
+    res = calibrate(obs, n_starts=4, n_jobs=-1)
+    res.params        # Params ajustados
+    res.residuals     # simulado − observado por año y columna
+    res.stderr        # error estándar aproximado de cada parámetro
+
+El optimizador es una evolución diferencial (rand/1/bin) sin derivadas: cada
+generación evalúa la población completa en lote, en serie reutilizando un
+`SimWorkspace` o repartida entre procesos (`n_jobs`). Varios arranques
+(`n_starts`) con semillas distintas reducen el riesgo de mínimos locales.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from model.simulate import Params, SimWorkspace, simulate
+except Exception:
+    # Fallback for running in a flat folder alongside simulate.py
+    from simulate import Params, SimWorkspace, simulate
+
+# Columnas de `simulate` que se pueden comparar contra datos observados
+TARGET_COLUMNS = ["AlumnosTotales"] + [f"G{i}" for i in range(1, 13)] + ["Facturacion", "Caja"]
+
+# Pesos por defecto: los 12 grados juntos pesan lo mismo que el total de alumnos
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "AlumnosTotales": 1.0,
+    **{f"G{i}": 1.0 / 12 for i in range(1, 13)},
+    "Facturacion": 1.0,
+    "Caja": 1.0,
+}
+
+# Parámetros candidatos y rangos de búsqueda (inferior, superior)
+DEFAULT_BOUNDS: Dict[str, Tuple[float, float]] = {
+    "beta_hacinamiento": (0.0, 5.0),
+    "tasa_bajas_imprevistas": (0.0, 0.10),
+    "tasa_bajas_max_por_calidad": (0.0, 0.30),
+    "alpha_candidatos_q": (0.0, 1.0),
+    "cac_base": (200.0, 3000.0),
+    "tasa_descenso_demanda": (0.0, 0.15),
+    "k_saturacion": (0.0, 5.0),
+    "k_bajas_precio": (0.0, 1.0),
+    "qref_candidatos": (0.3, 0.9),
+    "calidad_base": (0.4, 1.0),
+}
+
+
+@dataclass
+class CalibrationResult:
+    params: Params                       # Params ajustados
+    values: Dict[str, float]             # valores ajustados de los parámetros libres
+    loss: float                          # pérdida ponderada en el óptimo
+    residuals: pd.DataFrame              # simulado − observado (Año + columnas objetivo)
+    stderr: Dict[str, float]             # error estándar aproximado por parámetro
+    covariance: pd.DataFrame             # matriz de covarianza aproximada
+    starts: List[Dict[str, float]] = field(default_factory=list)  # mejor punto de cada arranque (+ "loss")
+    n_evals: int = 0
+
+
+def load_observed(path: str) -> pd.DataFrame:
+    """Lee un CSV alineado con la salida de `simulate`.
+
+    Requiere la columna `Año` (0 = año inicial del modelo) y al menos una de
+    `TARGET_COLUMNS`; el resto de las columnas se ignora. Celdas vacías se
+    tratan como datos faltantes y no cuentan en la pérdida.
+    """
+    df = pd.read_csv(path)
+    if "Año" not in df.columns:
+        raise ValueError("El CSV observado necesita una columna 'Año'.")
+    cols = [c for c in TARGET_COLUMNS if c in df.columns]
+    if not cols:
+        raise ValueError(f"El CSV observado no tiene ninguna columna objetivo: {TARGET_COLUMNS}")
+    df = df[["Año"] + cols].copy()
+    df["Año"] = df["Año"].astype(int)
+    if (df["Año"] < 0).any() or df["Año"].duplicated().any():
+        raise ValueError("La columna 'Año' debe tener valores enteros >= 0 sin repetir.")
+    return df.sort_values("Año").reset_index(drop=True)
+
+
+class _Objective:
+    """Pérdida ponderada de un vector de parámetros (en unidades naturales).
+
+    Cada columna se normaliza por el RMS de su serie observada para que
+    alumnos y montos en $ sean comparables; los pesos fijan la importancia
+    relativa. Pérdida = suma de cuadrados de `residual_vector`.
+    """
+
+    def __init__(self, observed: pd.DataFrame, base: Params, names: Sequence[str],
+                 weights: Dict[str, float]):
+        self.base = base
+        self.names = list(names)
+        self.years = int(observed["Año"].max())
+        self.rows = observed["Año"].to_numpy()
+        self.columns = [c for c in observed.columns if c != "Año" and weights.get(c, 0.0) > 0]
+        if not self.columns:
+            raise ValueError("Ninguna columna observada tiene peso positivo.")
+        obs = observed[self.columns].to_numpy(dtype=float)
+        self.mask = ~np.isnan(obs)
+        self.obs = np.where(self.mask, obs, 0.0)
+        n_obs = np.maximum(self.mask.sum(axis=0), 1)
+        rms = np.sqrt((self.obs ** 2).sum(axis=0) / n_obs)
+        # residuo escalado: sqrt(w / n) / escala, así la pérdida es una media ponderada por columna
+        w = np.array([weights[c] for c in self.columns])
+        self.scale = np.sqrt(w / n_obs) / np.maximum(rms, 1.0)
+        # Tipo declarado, no el valor en `base`: un preset JSON puede traer `2` para un float
+        self.int_fields = {f.name for f in fields(Params) if f.type in (int, "int")}
+        self.ws = SimWorkspace(self.years)
+
+    def params_for(self, x: np.ndarray) -> Params:
+        upd = {n: (int(round(v)) if n in self.int_fields else float(v)) for n, v in zip(self.names, x)}
+        return replace(self.base, years=self.years, **upd)
+
+    def simulated(self, x: np.ndarray) -> np.ndarray:
+        df, _ = simulate(self.params_for(x), workspace=self.ws)
+        return df[self.columns].to_numpy(dtype=float)[self.rows]
+
+    def residual_vector(self, x: np.ndarray) -> np.ndarray:
+        r = (self.simulated(x) - self.obs) * self.scale
+        return r[self.mask]
+
+    def loss(self, x: np.ndarray) -> float:
+        try:
+            r = self.residual_vector(x)
+        except Exception:
+            return np.inf
+        val = float(np.dot(r, r))
+        return val if np.isfinite(val) else np.inf
+
+
+# Objetivo por proceso (se inicializa una vez por worker para no re-enviarlo en cada tarea)
+_WORKER_OBJ: Optional[_Objective] = None
+
+
+def _init_worker(obj: _Objective) -> None:
+    global _WORKER_OBJ
+    _WORKER_OBJ = obj
+
+
+def _worker_loss(x: np.ndarray) -> float:
+    return _WORKER_OBJ.loss(x)
+
+
+def _evaluate(obj: _Objective, X: np.ndarray, pool: Optional[ProcessPoolExecutor], workers: int) -> np.ndarray:
+    if pool is None:
+        return np.array([obj.loss(x) for x in X])
+    chunk = max(1, len(X) // (4 * workers))
+    return np.fromiter(pool.map(_worker_loss, X, chunksize=chunk), dtype=float, count=len(X))
+
+
+def _differential_evolution(obj: _Objective, lo: np.ndarray, hi: np.ndarray, rng: np.random.Generator,
+                            pop_size: int, max_gens: int, F: float, CR: float, tol: float,
+                            pool: Optional[ProcessPoolExecutor], workers: int) -> Tuple[np.ndarray, float, int]:
+    """DE rand/1/bin en el cubo unitario; devuelve (mejor x, pérdida, evaluaciones)."""
+    d = len(lo)
+    span = hi - lo
+    # Inicialización por hipercubo latino
+    U = (rng.permuted(np.tile(np.arange(pop_size), (d, 1)), axis=1).T + rng.random((pop_size, d))) / pop_size
+    fit = _evaluate(obj, lo + U * span, pool, workers)
+    n_evals = pop_size
+    idx = np.arange(pop_size)
+    for _ in range(max_gens):
+        # Mutación: a + F (b − c) con a, b, c distintos entre sí y del individuo
+        others = np.array([rng.choice(np.delete(idx, i), 3, replace=False) for i in idx])
+        V = U[others[:, 0]] + F * (U[others[:, 1]] - U[others[:, 2]])
+        # Reflejar en los bordes para no acumular puntos en 0/1
+        V = np.where(V < 0.0, -V, V)
+        V = np.where(V > 1.0, 2.0 - V, V)
+        np.clip(V, 0.0, 1.0, out=V)
+        # Cruce binomial (al menos una coordenada del mutante)
+        cross = rng.random((pop_size, d)) < CR
+        cross[idx, rng.integers(0, d, pop_size)] = True
+        trial = np.where(cross, V, U)
+        trial_fit = _evaluate(obj, lo + trial * span, pool, workers)
+        n_evals += pop_size
+        better = trial_fit <= fit
+        U[better] = trial[better]
+        fit[better] = trial_fit[better]
+        finite = fit[np.isfinite(fit)]
+        if len(finite) == pop_size and np.std(finite) <= tol * (abs(np.mean(finite)) + 1e-12):
+            break
+    best = int(np.argmin(fit))
+    return lo + U[best] * span, float(fit[best]), n_evals
+
+
+def _uncertainty(obj: _Objective, x: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                 rel_step: float) -> np.ndarray:
+    """Covarianza aproximada s² (JᵀJ)⁻¹ con J por diferencias centrales.
+
+    El paso es una fracción del rango de búsqueda: las bajas aleatorias se
+    redondean a enteros, así que pasos muy chicos verían una pérdida escalonada.
+    Los parámetros que no mueven ningún residuo (no identificables con estos
+    datos) quedan con varianza NaN.
+    """
+    r0 = obj.residual_vector(x)
+    n, p = len(r0), len(x)
+    J = np.zeros((n, p))
+    for j in range(p):
+        h = rel_step * (hi[j] - lo[j])
+        xp, xm = x.copy(), x.copy()
+        xp[j] = min(x[j] + h, hi[j])
+        xm[j] = max(x[j] - h, lo[j])
+        J[:, j] = (obj.residual_vector(xp) - obj.residual_vector(xm)) / max(xp[j] - xm[j], 1e-12)
+    dof = max(n - p, 1)
+    s2 = float(np.dot(r0, r0)) / dof
+    cov = s2 * np.linalg.pinv(J.T @ J)
+    flat = np.linalg.norm(J, axis=0) <= 1e-12
+    cov[flat, :] = np.nan
+    cov[:, flat] = np.nan
+    return cov
+
+
+def calibrate(observed: pd.DataFrame,
+              base: Optional[Params] = None,
+              bounds: Optional[Dict[str, Tuple[float, float]]] = None,
+              weights: Optional[Dict[str, float]] = None,
+              n_starts: int = 4,
+              pop_size: Optional[int] = None,
+              max_gens: int = 150,
+              F: float = 0.7,
+              CR: float = 0.9,
+              tol: float = 1e-6,
+              n_jobs: int = 1,
+              seed: int = 0,
+              fd_rel_step: float = 0.01) -> CalibrationResult:
+    """Ajusta los parámetros de `bounds` para que `simulate` reproduzca `observed`.
+
+    `base` fija el resto de los parámetros (incluida `random_seed`, para que
+    la pérdida sea determinista). `n_jobs` > 1 reparte cada generación entre
+    procesos; -1 usa todos los núcleos. Con 10 parámetros y los valores por
+    defecto, cada arranque hace ~150 generaciones × 50 individuos.
+    """
+    base = base if base is not None else Params()
+    bounds = dict(bounds if bounds is not None else DEFAULT_BOUNDS)
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    unknown = [n for n in bounds if not hasattr(base, n)]
+    if unknown:
+        raise ValueError(f"Parámetros desconocidos en bounds: {unknown}")
+    names = list(bounds)
+    lo = np.array([bounds[n][0] for n in names], dtype=float)
+    hi = np.array([bounds[n][1] for n in names], dtype=float)
+    if np.any(hi <= lo):
+        raise ValueError("Cada rango de bounds debe cumplir inferior < superior.")
+
+    obj = _Objective(observed, base, names, weights)
+    pop_size = pop_size if pop_size is not None else max(15, 5 * len(names))
+    if n_starts < 1:
+        raise ValueError("n_starts debe ser >= 1.")
+    if pop_size < 4:
+        raise ValueError("pop_size debe ser >= 4 (la mutación usa 3 individuos distintos del actual).")
+    workers = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(obj,))
+    try:
+        starts, n_evals = [], 0
+        for s in np.random.SeedSequence(seed).spawn(n_starts):
+            x, f, n = _differential_evolution(obj, lo, hi, np.random.default_rng(s),
+                                              pop_size, max_gens, F, CR, tol, pool, workers)
+            starts.append((x, f))
+            n_evals += n
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    x_best, loss_best = min(starts, key=lambda sf: sf[1])
+    cov = _uncertainty(obj, x_best, lo, hi, fd_rel_step)
+    stderr = np.sqrt(np.clip(np.diag(cov), 0.0, None))  # NaN se conserva
+
+    fitted = obj.params_for(x_best)
+    sim = obj.simulated(x_best)
+    resid = pd.DataFrame(np.where(obj.mask, sim - obj.obs, np.nan), columns=obj.columns)
+    resid.insert(0, "Año", obj.rows)
+
+    return CalibrationResult(
+        params=replace(fitted, years=base.years),
+        values={n: getattr(fitted, n) for n in names},
+        loss=loss_best,
+        residuals=resid,
+        stderr=dict(zip(names, stderr.tolist())),
+        covariance=pd.DataFrame(cov, index=names, columns=names),
+        starts=[{**dict(zip(names, x.tolist())), "loss": f} for x, f in starts],
+        n_evals=n_evals,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from dataclasses import asdict
+
+    ap = argparse.ArgumentParser(description="Calibrar Params contra un CSV observado.")
+    ap.add_argument("observed", help="CSV con Año y columnas de simulate (AlumnosTotales, G1..G12, Facturacion, Caja)")
+    ap.add_argument("--preset", default=None, help="JSON de Params base (los campos desconocidos se ignoran)")
+    ap.add_argument("--starts", type=int, default=4)
+    ap.add_argument("--gens", type=int, default=150)
+    ap.add_argument("--jobs", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="guardar los Params ajustados en este JSON")
+    args = ap.parse_args()
+
+    base = Params()
+    if args.preset:
+        with open(args.preset) as fh:
+            base = replace(base, **{k: v for k, v in json.load(fh).items() if hasattr(base, k)})
+
+    res = calibrate(load_observed(args.observed), base=base, n_starts=args.starts,
+                    max_gens=args.gens, n_jobs=args.jobs, seed=args.seed)
+    print(f"loss={res.loss:.6g}  evals={res.n_evals}")
+    for n, v in res.values.items():
+        print(f"  {n:<28} {v:>14.6g} ± {res.stderr[n]:.3g}")
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(asdict(res.params), fh, indent=2)
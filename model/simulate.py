@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 from dataclasses import dataclass, asdict
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 
 @dataclass
 class Params:
@@ -89,21 +89,75 @@ class Params:
     # Aleatoriedad (para bajas aleatorias G3..G10)
     random_seed: int = 42
 
-def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+class SimWorkspace:
+    """Buffers preasignados reutilizables entre llamadas a `simulate`.
+
+    Pensado para correr el modelo muchas veces en un loop (barridos,
+    calibración): se crea una vez y se pasa como `workspace=`. Si cambia
+    `par.years`, los buffers se redimensionan solos.
+    """
+
+    SERIES = (
+        "Cand", "Act", "Caja", "Deuda", "Demanda",
+        "calidad", "facturacion", "sueldos", "inv_infra", "inv_calidad_alumno",
+        "mantenimiento", "marketing", "costos_opex",
+        "resultado_operativo", "capex_total", "capex_propio", "capex_financiado",
+        "interes_deuda", "amortizacion_deuda", "resultado_neto",
+        "cac", "nuevos_candidatos", "nuevos_candidatos_mkt", "nuevos_candidatos_q",
+        "admitidos", "rechazados", "selectividad",
+        "bajas_totales", "egresados", "pipeline_construcciones",
+    )
+    G = 12
+
+    def __init__(self, years: int = 20):
+        self.years = -1
+        self.resize(years)
+
+    def resize(self, years: int) -> None:
+        if years == self.years:
+            return
+        n, G = years + 1, self.G
+        self.years = years
+        # Stocks por grado (filas = años)
+        self.Gk = np.zeros((n, G))
+        self.Div = np.zeros((n, G))
+        self.Hac = np.zeros((n, G))
+        # Series agregadas
+        self.series = {name: np.zeros(n) for name in self.SERIES}
+        # Auxiliares por año (tamaño G)
+        self.bajas_vec = np.zeros(G)
+        self.cap_opt = np.zeros(G)
+        self.probs = np.zeros(8)
+
+    def reset(self) -> None:
+        self.Gk.fill(0.0)
+        self.Div.fill(0.0)
+        self.Hac.fill(0.0)
+        for a in self.series.values():
+            a.fill(0.0)
+
+
+def simulate(par: Params, workspace: Optional[SimWorkspace] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     T = par.years
     G = 12
     t = np.arange(T+1)
 
     rng = np.random.default_rng(par.random_seed)
 
+    ws = workspace if workspace is not None else SimWorkspace(T)
+    ws.resize(T)
+    ws.reset()
+    S = ws.series
+
     # Stocks
-    Gk = np.zeros((T+1, G), dtype=float)   # alumnos por grado
-    Div = np.zeros((T+1, G), dtype=float)  # divisiones por grado
-    Cand = np.zeros(T+1, dtype=float)      # (reporte)
-    Act = np.zeros(T+1, dtype=float)       # activos
-    Caja = np.zeros(T+1, dtype=float)      # caja
-    Deuda = np.zeros(T+1, dtype=float)     # deuda
-    Demanda = np.zeros(T+1, dtype=float)   # demanda potencial
+    Gk = ws.Gk                   # alumnos por grado
+    Div = ws.Div                 # divisiones por grado
+    Hac = ws.Hac                 # hacinamiento por grado
+    Cand = S["Cand"]             # (reporte)
+    Act = S["Act"]               # activos
+    Caja = S["Caja"]             # caja
+    Deuda = S["Deuda"]           # deuda
+    Demanda = S["Demanda"]       # demanda potencial
 
     # Iniciales
     Gk[0, :] = par.g_inicial
@@ -115,44 +169,43 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     Demanda[0] = par.demanda_potencial_inicial
 
     # Series agregadas
-    calidad = np.zeros(T+1)
-    facturacion = np.zeros(T+1)
-    sueldos = np.zeros(T+1)
-    inv_infra = np.zeros(T+1)               # realizadas (limitadas)
-    inv_calidad_alumno = np.zeros(T+1)      # realizadas (limitadas)
-    mantenimiento = np.zeros(T+1)
-    marketing = np.zeros(T+1)               # realizado (limitado)
-    costos_opex = np.zeros(T+1)
-
-    resultado_operativo = np.zeros(T+1)
-    capex_total = np.zeros(T+1)
-    capex_propio = np.zeros(T+1)
-    capex_financiado = np.zeros(T+1)
-    interes_deuda = np.zeros(T+1)
-    amortizacion_deuda = np.zeros(T+1)
-    resultado_neto = np.zeros(T+1)
+    calidad = S["calidad"]
+    facturacion = S["facturacion"]
+    sueldos = S["sueldos"]
+    inv_infra = S["inv_infra"]                        # realizadas (limitadas)
+    inv_calidad_alumno = S["inv_calidad_alumno"]      # realizadas (limitadas)
+    mantenimiento = S["mantenimiento"]
+    marketing = S["marketing"]                        # realizado (limitado)
+    costos_opex = S["costos_opex"]
+
+    resultado_operativo = S["resultado_operativo"]
+    capex_total = S["capex_total"]
+    capex_propio = S["capex_propio"]
+    capex_financiado = S["capex_financiado"]
+    interes_deuda = S["interes_deuda"]
+    amortizacion_deuda = S["amortizacion_deuda"]
+    resultado_neto = S["resultado_neto"]
 
     # Marketing y candidatos (flujos)
-    cac = np.zeros(T+1)
-    nuevos_candidatos = np.zeros(T+1)
-    nuevos_candidatos_mkt = np.zeros(T+1)
-    nuevos_candidatos_q = np.zeros(T+1)
-    admitidos = np.zeros(T+1)
-    rechazados = np.zeros(T+1)
-    selectividad = np.zeros(T+1)
+    cac = S["cac"]
+    nuevos_candidatos = S["nuevos_candidatos"]
+    nuevos_candidatos_mkt = S["nuevos_candidatos_mkt"]
+    nuevos_candidatos_q = S["nuevos_candidatos_q"]
+    admitidos = S["admitidos"]
+    rechazados = S["rechazados"]
+    selectividad = S["selectividad"]
 
     # Flujos académicos
-    bajas_totales = np.zeros(T+1)
-    egresados = np.zeros(T+1)
+    bajas_totales = S["bajas_totales"]
+    egresados = S["egresados"]
 
     # Pipeline
-    pipeline_construcciones = np.zeros(T+1)
+    pipeline_construcciones = S["pipeline_construcciones"]
 
-    def cap_opt(row_div):
-        return row_div * par.cupo_optimo
-
-    def cap_max(row_div):
-        return row_div * par.cupo_maximo
+    # Auxiliares reutilizados cada año
+    bajas_vec = ws.bajas_vec
+    Cap_opt_k = ws.cap_opt
+    probs = ws.probs
 
     def construir_en_anio(k: int) -> bool:
         if par.pipeline_start_year < 0:
@@ -166,12 +219,15 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
 
         # Totales y capacidades
         alumnos_k = Gk[k, :].sum()
-        Cap_opt_k = cap_opt(Div[k, :])
+        np.multiply(Div[k, :], par.cupo_optimo, out=Cap_opt_k)
         aulas_k = float(Div[k, :].sum())
 
         # Hacinamiento (penaliza cuando Gk > Cap_opt por grado)
-        with np.errstate(divide='ignore', invalid='ignore'):
-            hac_k = np.maximum(0.0, (Gk[k, :] - Cap_opt_k) / np.maximum(Cap_opt_k, 1.0))
+        hac_k = Hac[k, :]
+        np.subtract(Gk[k, :], Cap_opt_k, out=hac_k)
+        np.maximum(Cap_opt_k, 1.0, out=Cap_opt_k)
+        np.divide(hac_k, Cap_opt_k, out=hac_k)
+        np.maximum(hac_k, 0.0, out=hac_k)
         # promedio ponderado por alumnos
         hac_prom = 0.0 if alumnos_k <= 0 else float(np.dot(Gk[k, :], hac_k) / max(alumnos_k, 1.0))
 
@@ -192,14 +248,15 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
 
         # Asignación con restricción presupuestaria para discrecionales
         disponible = max(margen_prov, 0.0)
-        deseos = np.array([target_infra, target_calidad, target_mkt], dtype=float)
-        total_deseos = float(deseos.sum())
+        total_deseos = target_infra + target_calidad + target_mkt
         if total_deseos <= disponible + 1e-9:
-            inv_infra[k], inv_calidad_alumno[k], marketing[k] = deseos
+            inv_infra[k], inv_calidad_alumno[k], marketing[k] = target_infra, target_calidad, target_mkt
         else:
             if total_deseos > 0:
                 ratio = disponible / total_deseos
-                inv_infra[k], inv_calidad_alumno[k], marketing[k] = deseos * ratio
+                inv_infra[k] = target_infra * ratio
+                inv_calidad_alumno[k] = target_calidad * ratio
+                marketing[k] = target_mkt * ratio
             else:
                 inv_infra[k] = inv_calidad_alumno[k] = marketing[k] = 0.0
 
@@ -231,12 +288,12 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
             + (1.0 - calidad_prev) * par.tasa_bajas_max_por_calidad
             + presion_precio
         )
-        bajas_vec = np.zeros(G, dtype=float)
-        segmento = Gk[k, 2:10].copy()  # G3..G10
+        bajas_vec.fill(0.0)
+        segmento = Gk[k, 2:10]  # G3..G10
         total_segmento = float(segmento.sum())
         if total_segmento > 0 and tasa_bajas_total > 0:
             bajas_obj = min(int(round(tasa_bajas_total * total_segmento)), int(total_segmento))
-            probs = segmento / total_segmento
+            np.divide(segmento, total_segmento, out=probs)
             bajas_seg_int = rng.multinomial(bajas_obj, probs)
             bajas_vec[2:10] = bajas_seg_int
         bajas_totales[k] = float(bajas_vec.sum())
@@ -257,7 +314,7 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
                        + par.k_q_infra_inversion * infra_norm
                        + par.k_q_mantenimiento_netodep * mant_norm
                        + efecto_selectividad)
-        calidad[k] = float(np.clip(calidad_raw, 0.0, 1.0))
+        calidad[k] = min(max(calidad_raw, 0.0), 1.0)
 
         # OPEX y resultados
         costos_opex[k] = sueldos[k] + mantenimiento[k] + inv_infra[k] + inv_calidad_alumno[k] + marketing[k]
@@ -286,17 +343,16 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
             # 1) Candidatos: se vacía (admitidos + rechazados)
             next_C = 0.0
 
-            # 2) Alumnos por grado (avance completo anual)
-            next_G = np.zeros(G, dtype=float)
-            next_G[0] = admitidos[k]  # G1(t+1)
-            for gi in range(1, 11):   # G2..G11
-                bajas_prev = bajas_vec[gi-1] if 2 <= gi-1 <= 9 else 0.0
-                next_G[gi] = max(Gk[k, gi-1] - bajas_prev, 0.0)
-            # G12(t+1) = G11(t)
-            next_G[11] = max(Gk[k, 10], 0.0)
+            # 2) Alumnos por grado (avance completo anual), escrito directo en Gk[k+1]:
+            #    G1(t+1) = admitidos; G2..G12(t+1) = G1..G11(t) − bajas (solo G3..G10 tienen bajas)
+            next_G = Gk[k+1, :]
+            next_G[0] = admitidos[k]
+            np.subtract(Gk[k, :11], bajas_vec[:11], out=next_G[1:])
+            np.maximum(next_G[1:], 0.0, out=next_G[1:])
 
             # 3) Divisiones
-            next_D = Div[k, :].copy()
+            next_D = Div[k+1, :]
+            next_D[:] = Div[k, :]
             if build:
                 tramo = (k - par.pipeline_start_year) % 12 if par.pipeline_start_year >= 0 else 0
                 next_D[tramo] += 1.0
@@ -304,12 +360,12 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
 
             # 4) Capacidad/Población — límite duro del stock
             total_next = float(next_G.sum())
-            cap_total_max_next = float((next_D * par.cupo_maximo).sum())
+            cap_total_max_next = float(next_D.sum()) * par.cupo_maximo
             poblacion_max = float(Demanda[k])
             allowed = min(cap_total_max_next, poblacion_max)
             if total_next > allowed and total_next > 0:
                 factor = allowed / total_next
-                next_G = next_G * factor
+                next_G *= factor
 
             # 5) Activos (capex suma; inversión_infra es OPEX)
             dep = par.tasa_depreciacion_anual * Act[k]
@@ -325,8 +381,7 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
             next_Demanda = Demanda[k] * (1.0 - par.tasa_descenso_demanda)
 
             # Avances
-            Gk[k+1, :] = np.maximum(0.0, next_G)
-            Div[k+1, :] = next_D
+            np.maximum(next_G, 0.0, out=next_G)
             Cand[k+1] = next_C
             Act[k+1] = max(next_Act, 0.0)
             Deuda[k+1] = next_Deuda
@@ -352,14 +407,14 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     margen_neto = np.where(facturacion > 0, resultado_neto / facturacion, 0.0)
     costos_totales_cash = costos_opex + capex_propio + interes_deuda + amortizacion_deuda
 
-    df = pd.DataFrame({
+    cols = {
         "Año": t,
         "DemandaPotencial": Demanda,
         "AlumnosTotales": rint(Gk.sum(axis=1)),
         "Calidad": calidad,
         "AulasTotales": rint(aulas),
-        "CapacidadMaxTotal": rint((Div * par.cupo_maximo).sum(axis=1)),
-        "CapacidadOptTotal": rint((Div * par.cupo_optimo).sum(axis=1)),
+        "CapacidadMaxTotal": rint(aulas * par.cupo_maximo),
+        "CapacidadOptTotal": rint(aulas * par.cupo_optimo),
         "Facturacion": facturacion,
         "Sueldos": sueldos,
         "InversionInfra": inv_infra,
@@ -391,16 +446,17 @@ def simulate(par: Params) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         "Egresados": rint(egresados),
         "PipelineConstrucciones": pipeline_construcciones,
         "Activos": Act
-    })
+    }
 
-    # Series por grado
+    # Series por grado (el hacinamiento ya se calculó dentro del loop)
+    G_int = rint(Gk)
     for gi in range(G):
-        df[f"G{gi+1}"] = rint(Gk[:, gi])
-        df[f"DivG{gi+1}"] = Div[:, gi]
-        Cap_opt_series = Div[:, gi] * par.cupo_optimo
-        with np.errstate(divide='ignore', invalid='ignore'):
-            hac_series = np.maximum(0.0, (Gk[:, gi] - Cap_opt_series) / np.maximum(Cap_opt_series, 1.0))
-        df[f"HacG{gi+1}"] = hac_series
+        cols[f"G{gi+1}"] = G_int[:, gi]
+        cols[f"DivG{gi+1}"] = Div[:, gi]
+        cols[f"HacG{gi+1}"] = Hac[:, gi]
+
+    # copy=True: el DataFrame no debe compartir memoria con el workspace reutilizable
+    df = pd.DataFrame(cols, copy=True)
 
     meta = {"params": asdict(par)}
     return df, meta